@@ -5,39 +5,281 @@ Processes invoices and purchase orders from PDFs and images,
 extracts data, and saves to Excel with automatic linking.
 """
 
+import io
 import os
 import re
+import json
+import hashlib
 import logging
+import tempfile
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional, Tuple
 
 import pdfplumber
+import pypdfium2 as pdfium
 import pytesseract
 from PIL import Image
 import openpyxl
 from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
 from openpyxl.styles import Font, PatternFill, Alignment
-from pdf2image import convert_from_path
+from pdf2image import convert_from_path, pdfinfo_from_path
+
+try:
+    from tesserocr import PyTessBaseAPI, OEM, PSM
+except ImportError:  # tesserocr is optional, fall back to the tesseract binary
+    PyTessBaseAPI = None
+
+# Tesseract settings: LSTM engine, text treated as a single uniform block
+_TESSERACT_CONFIG = "--oem 1 --psm 6"
+
+
+# Regex patterns are compiled once at import. Within each tuple the patterns
+# are tried in order and the first match wins.
+
+# Table format: PO NO | PO DATE | GR NO | GR DATE header followed by values.
+# One pattern covers the variants seen so far: pipes or spaces between columns,
+# PODATE without a space, GR DATE missing from the header, and values on the
+# next line or further down. The values must start a line (no leading pipe), or
+# be a 10 digit PO number and 7 digit GR number, so page numbers or stray digits
+# between the header and the row are not taken for the PO number.
+# This is broader than the separate patterns it replaced in two ways: pipes are
+# accepted between values in every layout, and without GR DATE in the header
+# line-start values of any length are accepted (only 10/7 digits were before).
+_TABLE_RE = re.compile(
+    r'PO\s*NO[\s|]*PO\s*DATE[\s|]*GR\s*NO[\s\S]*?'
+    r'(?:\n\s*|(?<!\d)(?=\d{10}[\s|]+[\d-]+[-/]\w+[-/]\d+[\s|]+\d{7}[\s|]))'
+    r'(\d+)[\s|]+([\d-]+[-/]\w+[-/]\d+)[\s|]*(\d+)[\s|]+([\d-]+[-/]\w+[-/]\d+)',
+    re.IGNORECASE
+)
+
+# Fast path for the common layout: the header, then the values at the start of
+# the next line. Matched at known offsets, so there is no backtracking over the text.
+_TABLE_HEADER_RE = re.compile(r'PO\s*NO[\s|]*PO\s*DATE[\s|]*GR\s*NO', re.IGNORECASE)
+_TABLE_ROW_RE = re.compile(r'\s*(\d+)[\s|]+([\d-]+[-/]\w+[-/]\d+)[\s|]*(\d+)[\s|]+([\d-]+[-/]\w+[-/]\d+)')
+
+# Labelled invoice fields, found in a single pass over the text. Each
+# alternative captures one named group; the first match per field wins.
+_FIELD_PATTERNS = (
+    # Invoice Number - capture FULL number including prefix (A10001, 10001, etc.)
+    # from Invoice No / Invoice # / Invoice Number / Inv. No
+    r'(?:Invoice\s*(?:No[:\s.]*|#[:\s]*|Number[:\s]*)|Inv[\s.]*No[:\s.]*)(?P<invoice_number>[A-Z]?\d+)',
+    # (\w+ also covers numeric months, e.g. 01/08/2025)
+    r'Invoice\s*Date[:\s.]*(?P<invoice_date>\d{1,2}[-/]\w+[-/]\d{2,4})',
+    r'PO\s*NO[:\s.]*(?P<po_number>\d+)',
+    r'PO\s*DATE[:\s.]*(?P<po_date>\d{1,2}[-/]\w+[-/]\d{2,4})',
+    r'GR\s*NO[:\s.]*(?P<gr_id>\d+)',
+    r'GR\s*DATE[:\s.]*(?P<gr_date>\d{1,2}[-/]\w+[-/]\d{2,4})',
+    r'(?:^|\n)\s*TOTAL[:\s]+(?P<subtotal>[0-9,]+\.?\d*)',
+    r'(?:KPRA|Tax)\s*\d+%[:\s]+(?P<tax>[0-9,]+\.?\d*)',
+    r'GRAND\s*TOTAL[:\s]+(?P<grand_total>[0-9,]+\.?\d*)',
+)
+_ALL_FIELDS_RE = re.compile('|'.join(_FIELD_PATTERNS), re.IGNORECASE | re.MULTILINE)
+
+# Fallback patterns, tried in order for fields the single pass did not find
+
+_INVOICE_NO_PATTERNS = tuple(re.compile(p, re.IGNORECASE | re.MULTILINE) for p in (
+    r'Invoice\s*No[:\s.]*\s*$.*?^.*?([A-Z]?\d{4,})',  # Invoice No: on one line, number on next
+))
+
+# Invoice Date - more flexible patterns
+_INVOICE_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'[Ii]nvoice[\s\S]{0,30}Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',  # Flexible spacing
+    r'[Ii]woie[\s\S]{0,20}Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',  # OCR error: Invoice -> Iwoie
+    r'iavoie[\s\S]{0,20}Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',  # OCR error: Invoice -> iavoie
+    r'[Ii]nvoice\s*No[:\s]*\d+[\s\S]{0,100}?(\d{1,2}[-/]\w+[-/]\d{2,4})',  # Date near Invoice No
+))
+
+_PO_NO_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'PO\s*Number[:\s]*(\d+)',
+    r'P\.?O\.?[:\s]*(\d+)',
+    r'Purchase\s*Order[:\s]*(\d+)',
+))
+
+_PO_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'P\.?O\.?\s*Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',
+))
+
+_GR_NO_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'GR\s*Number[:\s]*(\d+)',
+    r'G\.?R\.?[:\s]*(\d+)',
+    r'Goods\s*Receipt[:\s]*(\d+)',
+))
+
+_GR_DATE_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'G\.?R\.?\s*Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',
+))
+
+_SUBTOTAL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Sub\s*Total[:\s]+([0-9,]+\.?\d*)',
+    r'Amount[:\s]+([0-9,]+\.?\d*)',
+))
+
+_TAX_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'(?:KPRA|Tax)[:\s]+([0-9,]+\.?\d*)',
+    r'VAT\s*\d+%[:\s]+([0-9,]+\.?\d*)',
+))
+
+_GRAND_TOTAL_PATTERNS = tuple(re.compile(p, re.IGNORECASE) for p in (
+    r'Total\s*Amount[:\s]+([0-9,]+\.?\d*)',
+    r'Net\s*Total[:\s]+([0-9,]+\.?\d*)',
+))
+
+# Dates as written on invoices: day, month name or number, 2 or 4 digit year,
+# with the same separator twice (22-Jul-25, 22/07/2025)
+_DATE_RE = re.compile(r'(\d{1,2})([-/])([A-Za-z]{3}|\d{1,2})\2(\d{4}|\d{2})', re.ASCII)
+_MONTHS = {
+    'jan': 1, 'feb': 2, 'mar': 3, 'apr': 4, 'may': 5, 'jun': 6,
+    'jul': 7, 'aug': 8, 'sep': 9, 'oct': 10, 'nov': 11, 'dec': 12
+}
+
+# Thousands separators removed from amounts before float()
+_STRIP_COMMAS = str.maketrans('', '', ',')
+
+# Document type keywords, found in a single pass over the text
+_DOCTYPE_RE = re.compile(
+    r'(?P<invoice_no>invoice no)|(?P<invoice>invoice)|(?P<purchase_order>purchase order)|(?P<po_no>po no)',
+    re.IGNORECASE
+)
+
+# Purchase order documents
+_PO_DOC_NUMBER_RE = re.compile(r'PO\s*(?:Number|NO)[:\s]+(\d+)', re.IGNORECASE)
+_PO_DOC_DATE_RE = re.compile(r'PO\s*DATE[:\s]+(\d{1,2}[-/]\w+[-/]\d{2,4})', re.IGNORECASE)
+_PO_DOC_AMOUNT_RE = re.compile(r'(?:Amount|Total)[:\s]+([0-9,]+\.?\d*)', re.IGNORECASE)
+_PO_DOC_DEPARTMENT_RE = re.compile(r'Department[:\s]+([A-Za-z\s]+)', re.IGNORECASE)
+
+
+# Excel sheet layouts
+_PO_HEADERS = ["Serial Number", "PO Number", "PO Date", "PO Amount", "Department"]
+_INVOICE_HEADERS = [
+    "Serial Number", "Invoice Number", "Invoice Date", "PO Number",
+    "PO Date", "Department", "GR ID", "GR Date", "Subtotal",
+    "Tax 12%", "Grand Total", "Status"
+]
+
+
+def _search_first(patterns: Tuple[re.Pattern, ...], text: str) -> Optional[re.Match]:
+    """Return the match of the first pattern that matches text"""
+    for pattern in patterns:
+        match = pattern.search(text)
+        if match:
+            return match
+    return None
+
+
+def _scan_fields(text: str) -> Dict[str, str]:
+    """Find the first value of each labelled field in one pass over text"""
+    fields = {}
+    for match in _ALL_FIELDS_RE.finditer(text):
+        fields.setdefault(match.lastgroup, match.group(match.lastgroup))
+        if len(fields) == _ALL_FIELDS_RE.groups:  # Every field found
+            break
+    return fields
+
+
+def _field_value(fields: Dict[str, str], field: str, fallbacks: Tuple[re.Pattern, ...], text: str) -> Optional[str]:
+    """Return a field from the single pass, else from its fallback patterns"""
+    if field in fields:
+        return fields[field]
+    match = _search_first(fallbacks, text)
+    return match.group(1) if match else None
+
+
+# Processor instance owned by each worker process (see _init_worker)
+_worker_processor = None
+
+# Processor attributes that only the main process uses, or that can't be shared
+# with a worker process (thread pools, OCR handles)
+_MAIN_PROCESS_STATE = ('workbook', '_po_rows', '_invoice_rows', '_invoice_index',
+                       '_po_index', '_processed_files', '_tess_local', '_ocr_pool',
+                       '_io_pool')
+
+
+def _init_worker(processor: "InvoiceProcessor", ocr_threads: int):
+    """Install the processor in a worker process and configure its logging"""
+    global _worker_processor
+    # With the fork start method the processor is inherited instead of pickled,
+    # so __getstate__ never ran: drop the parent's state here as well
+    for name in _MAIN_PROCESS_STATE:
+        processor.__dict__.pop(name, None)
+    processor._io_pool = None
+    processor._setup_ocr()
+    _worker_processor = processor
+    processor.ocr_threads = ocr_threads
+    processor._setup_logging()
+
+
+def _process_file_in_worker(file_path: Path, digest: Optional[str]) -> Tuple[Optional[Dict], Optional[Dict]]:
+    """Run process_file on the worker's processor instance"""
+    return _worker_processor.process_file(file_path, digest)
 
 
 class InvoiceProcessor:
     """Main class for processing invoices and POs"""
     
-    def __init__(self, invoices_folder: str = "invoices", excel_file: str = "invoices.xlsx", log_file: str = "log.txt"):
+    def __init__(self, invoices_folder: str = "invoices", excel_file: str = "invoices.xlsx", log_file: str = "log.txt",
+                 debug: bool = True):
         self.invoices_folder = Path(invoices_folder)
         self.excel_file = Path(excel_file)
         self.log_file = Path(log_file)
+        self.debug = debug
+        
+        # Background writer for debug text files, created on first use
+        self._io_pool = None
+        
+        # Extracted text for debugging, plus a cache of OCR results keyed by file hash
+        self.debug_folder = Path("debug_ocr_text")
+        self.text_cache_folder = self.debug_folder / "cache"
+        self.processed_files_file = self.debug_folder / "processed_files.json"
         
         # Supported file extensions
         self.pdf_extensions = ['.pdf']
         self.image_extensions = ['.jpg', '.jpeg', '.png', '.tiff', '.tif', '.bmp']
         
+        # Worker processes for OCR (Tesseract runs multiple threads per instance,
+        # so use half the cores to avoid oversubscription)
+        self.max_workers = max(1, (os.cpu_count() or 1) // 2)
+        
+        # Threads for OCR of PDF pages; inside worker processes this budget is
+        # shared between the workers (see process_all_files)
+        self.ocr_threads = self.max_workers
+        
+        # Number of PDF pages rendered to images at once for OCR
+        self.pdf_page_chunk = 8
+        
+        # OCR cost grows with pixel count: render PDFs at 200 DPI and shrink
+        # larger images (e.g. phone photos) to this size on the long edge
+        self.pdf_ocr_dpi = 200
+        self.ocr_max_image_size = 2400
+        
         # Setup logging
         self._setup_logging()
         
+        # Setup OCR engine
+        self._setup_ocr()
+        
         # Initialize Excel file
         self._initialize_excel()
+        
+        # Load hashes of files already recorded in the Excel file
+        self._load_processed_files()
+    
+    def __getstate__(self):
+        """Drop Excel state when the processor is sent to a worker process"""
+        state = self.__dict__.copy()
+        for name in _MAIN_PROCESS_STATE:
+            state.pop(name, None)
+        state['_io_pool'] = None
+        return state
+    
+    def __setstate__(self, state):
+        """Restore state in a worker process with its own OCR engine"""
+        self.__dict__.update(state)
+        self._setup_ocr()
     
     def _setup_logging(self):
         """Setup logging configuration"""
@@ -51,118 +293,251 @@ class InvoiceProcessor:
         )
         self.logger = logging.getLogger(__name__)
     
+    def _setup_ocr(self):
+        """Setup OCR state; Tesseract handles and page threads are created lazily"""
+        self._tess_local = threading.local()
+        self._ocr_pool = None
+    
+    def _ocr_image(self, image) -> str:
+        """Run OCR on a PIL image, reusing this thread's Tesseract handle"""
+        if PyTessBaseAPI is None:
+            return pytesseract.image_to_string(image, config=_TESSERACT_CONFIG)
+        
+        api = getattr(self._tess_local, 'api', None)
+        if api is None:
+            # Loading the language model is expensive, so keep one handle per thread
+            api = self._tess_local.api = PyTessBaseAPI(psm=PSM.SINGLE_BLOCK, oem=OEM.LSTM_ONLY)
+        api.SetImage(image)
+        return api.GetUTF8Text()
+    
+    def _ocr_image_file(self, image_path: str) -> str:
+        """Run OCR on an image file rendered from a PDF page"""
+        with Image.open(image_path) as image:
+            return self._ocr_image(image)
+    
     def _initialize_excel(self):
-        """Initialize or load Excel file with required sheets"""
+        """Load the existing Excel file, if any, and index its records
+        
+        New records are buffered in memory and written by save_excel: a new file
+        is written in one pass, an existing one gets the new rows appended.
+        """
+        # Rows added since the last save
+        self._po_rows = []
+        self._invoice_rows = []
+        
+        self.workbook = None
         if self.excel_file.exists():
             self.logger.info(f"Loading existing Excel file: {self.excel_file}")
+            # Loaded once: indexed now and appended to by save_excel
             self.workbook = openpyxl.load_workbook(self.excel_file)
         else:
             self.logger.info(f"Creating new Excel file: {self.excel_file}")
-            self.workbook = Workbook()
-            self.workbook.remove(self.workbook.active)  # Remove default sheet
-            self._create_sheets()
-        
-        # Ensure both sheets exist
-        if "PO_Details" not in self.workbook.sheetnames:
-            self._create_po_sheet()
-        if "Invoice_Details" not in self.workbook.sheetnames:
-            self._create_invoice_sheet()
-    
-    def _create_sheets(self):
-        """Create both required sheets"""
-        self._create_po_sheet()
-        self._create_invoice_sheet()
-    
-    def _create_po_sheet(self):
-        """Create PO_Details sheet with headers"""
-        ws = self.workbook.create_sheet("PO_Details")
-        headers = ["Serial Number", "PO Number", "PO Date", "PO Amount", "Department"]
-        ws.append(headers)
-        self._style_header(ws)
-        self.logger.info("Created PO_Details sheet")
-    
-    def _create_invoice_sheet(self):
-        """Create Invoice_Details sheet with headers"""
-        ws = self.workbook.create_sheet("Invoice_Details")
-        headers = [
-            "Serial Number", "Invoice Number", "Invoice Date", "PO Number",
-            "PO Date", "Department", "GR ID", "GR Date", "Subtotal",
-            "Tax 12%", "Grand Total", "Status"
-        ]
-        ws.append(headers)
-        self._style_header(ws)
-        self.logger.info("Created Invoice_Details sheet")
+        
+        self._build_indexes()
+    
+    def _build_indexes(self):
+        """Index existing invoice and PO numbers so lookups don't scan the sheets
+        
+        Also sets the next serial numbers, continuing after the existing rows.
+        """
+        self._invoice_index = set()
+        self._po_index = {}
+        self._po_serial = 1
+        self._invoice_serial = 1
+        if self.workbook is None:
+            return
+        
+        if "Invoice_Details" in self.workbook.sheetnames:
+            ws = self.workbook["Invoice_Details"]
+            for row in ws.iter_rows(min_row=2, values_only=True):
+                self._invoice_index.add(row[1])  # Invoice Number (index 1)
+            self._invoice_serial = ws.max_row
+        
+        # PO Number -> (PO Date, Department); the first row for a PO wins
+        if "PO_Details" in self.workbook.sheetnames:
+            ws = self.workbook["PO_Details"]
+            for row in ws.iter_rows(min_row=2, values_only=True):
+                self._po_index.setdefault(row[1], (row[2], row[4]))
+            self._po_serial = ws.max_row
+    
+    def _load_processed_files(self):
+        """Load hashes of files whose records are already in the Excel file"""
+        self._processed_files = set()
+        
+        # A new Excel file has no records yet, so every file must be processed again
+        if not self.excel_file.exists() or not self.processed_files_file.exists():
+            return
+        
+        try:
+            with open(self.processed_files_file, 'r', encoding='utf-8') as f:
+                self._processed_files = set(json.load(f))
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"Could not read {self.processed_files_file}: {str(e)}")
+    
+    def _write_sheet(self, workbook: Workbook, title: str, headers: List[str], rows: List[list]):
+        """Write a sheet with a styled header row to a write-only workbook"""
+        ws = workbook.create_sheet(title)
+        ws.append(self._style_header(ws, headers))
+        for row in rows:
+            ws.append(row)
     
-    def _style_header(self, worksheet):
-        """Apply styling to header row"""
+    def _append_sheet(self, workbook: Workbook, title: str, headers: List[str], rows: List[list]):
+        """Append rows to a sheet of an existing workbook, creating it if missing"""
+        if title not in workbook.sheetnames:
+            ws = workbook.create_sheet(title)
+            ws.append(self._style_header(ws, headers))
+            self.logger.info(f"Created {title} sheet")
+        ws = workbook[title]
+        for row in rows:
+            ws.append(row)
+    
+    def _style_header(self, worksheet, headers: List[str]) -> List[WriteOnlyCell]:
+        """Build the styled header row"""
         header_fill = PatternFill(start_color="366092", end_color="366092", fill_type="solid")
         header_font = Font(bold=True, color="FFFFFF")
         
-        for cell in worksheet[1]:
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(worksheet, value=header)
             cell.fill = header_fill
             cell.font = header_font
             cell.alignment = Alignment(horizontal="center", vertical="center")
-    
-    def _get_next_serial_number(self, sheet_name: str) -> int:
-        """Get next serial number for a sheet"""
-        ws = self.workbook[sheet_name]
-        max_row = ws.max_row
-        if max_row == 1:  # Only header exists
-            return 1
-        return max_row  # Next row number (1-indexed, minus header)
+            cells.append(cell)
+        return cells
     
     def extract_text_from_pdf(self, pdf_path: Path) -> str:
-        """Extract text from PDF using pdfplumber or OCR"""
+        """Extract text from PDF using pypdfium2, pdfplumber or OCR"""
+        return self._extract_pdf_text(pdf_path)[0]
+    
+    def _extract_pdf_text(self, pdf_path: Path) -> Tuple[str, bool]:
+        """Extract text from PDF, returning the text and whether extraction completed
+        
+        On an error the text read so far is returned, flagged as incomplete.
+        """
         text = ""
         
         try:
-            # Try text extraction first
+            # Try the text layer with pypdfium2 first, it is much faster than pdfplumber
+            try:
+                text = self._extract_text_pdfium(pdf_path)
+            except pdfium.PdfiumError as e:
+                self.logger.warning(f"pypdfium2 could not read {pdf_path.name}: {str(e)}")
+            
+            if text.strip():
+                self.logger.info(f"Extracted text from {pdf_path.name} using pypdfium2")
+                return text, True
+            
+            # Fall back to pdfplumber
+            buffer = io.StringIO()
             with pdfplumber.open(pdf_path) as pdf:
                 for page in pdf.pages:
                     page_text = page.extract_text()
+                    page.close()  # Drop the page's cached chars/objects
                     if page_text:
-                        text += page_text + "\n"
+                        buffer.write(page_text)
+                        buffer.write("\n")
+            text = buffer.getvalue()
             
             # If no text found, use OCR
             if not text.strip():
                 self.logger.info(f"No text layer found in {pdf_path.name}, using OCR")
-                text = self._ocr_pdf(pdf_path)
-            else:
-                self.logger.info(f"Extracted text from {pdf_path.name} using pdfplumber")
+                return self._ocr_pdf(pdf_path)
+            
+            self.logger.info(f"Extracted text from {pdf_path.name} using pdfplumber")
+            return text, True
         
         except Exception as e:
             self.logger.error(f"Error extracting text from {pdf_path.name}: {str(e)}")
             self._log_error(pdf_path.name, str(e))
         
-        return text
+        return text, False
     
-    def _ocr_pdf(self, pdf_path: Path) -> str:
-        """Perform OCR on PDF by converting to images"""
-        text = ""
+    def _extract_text_pdfium(self, pdf_path: Path) -> str:
+        """Extract the PDF text layer with pypdfium2"""
+        buffer = io.StringIO()
+        pdf = pdfium.PdfDocument(pdf_path)
         try:
-            images = convert_from_path(pdf_path)
-            for i, image in enumerate(images):
-                self.logger.info(f"OCR processing page {i+1} of {pdf_path.name}")
-                page_text = pytesseract.image_to_string(image)
-                text += page_text + "\n"
+            for page in pdf:
+                textpage = page.get_textpage()
+                page_text = textpage.get_text_bounded()
+                textpage.close()
+                page.close()
+                if page_text:
+                    buffer.write(page_text.replace("\r\n", "\n"))
+                    buffer.write("\n")
+        finally:
+            pdf.close()
+        
+        return buffer.getvalue()
+    
+    def _ocr_pdf(self, pdf_path: Path) -> Tuple[str, bool]:
+        """Perform OCR on PDF by converting to images
+        
+        Returns the text and whether every page was processed.
+        """
+        buffer = io.StringIO()
+        try:
+            page_count = pdfinfo_from_path(pdf_path)["Pages"]
+            self.logger.info(f"OCR processing {page_count} pages of {pdf_path.name}")
+            
+            # Pages are independent; Tesseract releases the GIL (tesserocr) or
+            # runs as a subprocess (pytesseract), so threads run them concurrently
+            if self._ocr_pool is None:
+                self._ocr_pool = ThreadPoolExecutor(max_workers=self.ocr_threads)
+            
+            # Render a chunk of pages at a time to image files on disk, so long
+            # PDFs don't hold every page image in memory
+            with tempfile.TemporaryDirectory() as temp_dir:
+                for first_page in range(1, page_count + 1, self.pdf_page_chunk):
+                    last_page = min(first_page + self.pdf_page_chunk - 1, page_count)
+                    image_paths = convert_from_path(pdf_path, dpi=self.pdf_ocr_dpi, grayscale=True,
+                                                    first_page=first_page, last_page=last_page,
+                                                    output_folder=temp_dir, fmt='jpeg', paths_only=True,
+                                                    thread_count=self.ocr_threads)
+                    for page_text in self._ocr_pool.map(self._ocr_image_file, image_paths):
+                        buffer.write(page_text)
+                        buffer.write("\n")
         except Exception as e:
             self.logger.error(f"OCR error on {pdf_path.name}: {str(e)}")
             self._log_error(pdf_path.name, f"OCR error: {str(e)}")
+            return buffer.getvalue(), False
         
-        return text
+        return buffer.getvalue(), True
     
     def extract_text_from_image(self, image_path: Path) -> str:
         """Extract text from image using OCR"""
-        text = ""
+        return self._extract_image_text(image_path)[0]
+    
+    def _extract_image_text(self, image_path: Path) -> Tuple[str, bool]:
+        """OCR an image, returning the text and whether OCR completed"""
         try:
-            image = Image.open(image_path)
-            text = pytesseract.image_to_string(image)
+            with Image.open(image_path) as image:
+                if max(image.size) > self.ocr_max_image_size:
+                    image.thumbnail((self.ocr_max_image_size, self.ocr_max_image_size), Image.LANCZOS)
+                gray_image = image.convert("L")
+            try:
+                text = self._ocr_image(gray_image)
+            finally:
+                gray_image.close()
             self.logger.info(f"OCR extracted text from {image_path.name}")
         except Exception as e:
             self.logger.error(f"Error processing image {image_path.name}: {str(e)}")
             self._log_error(image_path.name, str(e))
+            return "", False
         
-        return text
+        return text, True
+    
+    def _match_table_row(self, text: str, header_match: re.Match) -> Optional[re.Match]:
+        """Match the table values when they start on the line after the header"""
+        line_end = text.find('\n', header_match.end())
+        if line_end == -1:
+            return None
+        
+        # Digits later on the header line could start the values, leave that to the full pattern
+        if any(c.isdigit() for c in text[header_match.end():line_end]):
+            return None
+        
+        return _TABLE_ROW_RE.match(text, line_end)
     
     def _parse_table_format(self, text: str) -> Dict:
         """Parse table format where headers and values are on separate lines"""
@@ -170,27 +545,17 @@ class InvoiceProcessor:
         
         # Look for the table pattern: PO NO | PO DATE | GRNO | GR DATE
         # followed by values on the next line(s)
-        # Multiple patterns to handle various formats
-        table_patterns = [
-            # Pattern 1: Standard format with pipes
-            r'PO\s*NO[\s|]*PO\s*DATE[\s|]*GR\s*NO[\s|]*GR\s*DATE.*?\n\s*(\d+)\s+([\d-]+[-/]\w+[-/][\d]+)[\s|]*(\d+)\s+([\d-]+[-/]\w+[-/][\d]+)',
-            # Pattern 2: With extra pipes between GR NO and GR DATE (like 10028)
-            r'PO\s*NO[\s|]*PO\s*DATE[\s|]*GR\s*NO[\s|]*GR\s*DATE.*?\n\s*(\d+)[\s|]+([\d-]+[-/]\w+[-/][\d]+)[\s|]+([\d]+)[\s|]+([\d-]+[-/]\w+[-/][\d]+)',
-            # Pattern 3: Compact format with specific spacing
-            r'PO\s*NO[\s|]+PO\s*DATE[\s|]+GR\s*NO[\s|]+GR\s*DATE[\s\S]*?(\d{10})[\s|]+([\d-]+[-/]\w+[-/][\d]+)[\s|]+([\d]{7})[\s|]+([\d-]+[-/]\w+[-/][\d]+)',
-            # Pattern 4: PODATE without space (like 1523)
-            r'PO\s*NO[\s|]*PODATE[\s|]*GR\s*NO[\s\S]*?(\d{10})\s+([\d-]+[-/]\w+[-/][\d]+)[\s|]+([\d]{7})\s+([\d-]+[-/]\w+[-/][\d]+)',
-        ]
+        header_match = _TABLE_HEADER_RE.search(text)
+        if not header_match:
+            return data
         
-        for pattern in table_patterns:
-            table_match = re.search(pattern, text, re.IGNORECASE | re.DOTALL)
-            if table_match:
-                data['po_number'] = table_match.group(1).strip()
-                data['po_date'] = self._parse_date(table_match.group(2).strip())
-                data['gr_id'] = table_match.group(3).strip()
-                data['gr_date'] = self._parse_date(table_match.group(4).strip())
-                self.logger.info(f"Extracted from table: PO={data['po_number']}, GR={data['gr_id']}")
-                break
+        table_match = self._match_table_row(text, header_match) or _TABLE_RE.search(text, header_match.start())
+        if table_match:
+            data['po_number'] = table_match.group(1).strip()
+            data['po_date'] = self._parse_date(table_match.group(2).strip())
+            data['gr_id'] = table_match.group(3).strip()
+            data['gr_date'] = self._parse_date(table_match.group(4).strip())
+            self.logger.info(f"Extracted from table: PO={data['po_number']}, GR={data['gr_id']}")
         
         return data
     
@@ -199,131 +564,65 @@ class InvoiceProcessor:
         data = {}
         
         try:
-            # Log extracted text for debugging (first 500 chars)
-            self.logger.debug(f"Extracted text preview: {text[:500]}...")
+            # Log extracted text for debugging (first 500 chars, only formatted
+            # when debug logging is enabled)
+            self.logger.debug("Extracted text preview: %.500s...", text)
             
             # First try to parse table format (common in these invoices)
             table_data = self._parse_table_format(text)
             data.update(table_data)
             
+            # Labelled fields in one pass; fallback patterns only run for missing ones
+            fields = _scan_fields(text)
+            
             # Invoice Number - capture FULL number including prefix (A10001, 10001, etc.)
-            invoice_patterns = [
-                r'Invoice\s*No[:\s.]*[:\s]*([A-Z]?\d+)',  # Captures A10001 or 10001 fully
-                r'Invoice\s*#[:\s]*([A-Z]?\d+)',
-                r'Inv[\s.]*No[:\s.]*[:\s]*([A-Z]?\d+)',
-                r'Invoice\s*Number[:\s]*([A-Z]?\d+)',
-                r'Invoice\s*No[:\s.]*\s*$.*?^.*?([A-Z]?\d{4,})',  # Invoice No: on one line, number on next
-            ]
-            for pattern in invoice_patterns:
-                invoice_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if invoice_match:
-                    data['invoice_number'] = invoice_match.group(1)
-                    break
+            invoice_number = _field_value(fields, 'invoice_number', _INVOICE_NO_PATTERNS, text)
+            if invoice_number:
+                data['invoice_number'] = invoice_number
             
-            # Invoice Date - more flexible patterns
-            date_patterns = [
-                r'Invoice\s*Date[:\s.]*[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',
-                r'Invoice\s*Date[:\s.]*[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-                r'[Ii]nvoice[\s\S]{0,30}Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',  # Flexible spacing
-                r'[Ii]woie[\s\S]{0,20}Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',  # OCR error: Invoice -> Iwoie
-                r'iavoie[\s\S]{0,20}Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',  # OCR error: Invoice -> iavoie
-                r'[Ii]nvoice\s*No[:\s]*\d+[\s\S]{0,100}?(\d{1,2}[-/]\w+[-/]\d{2,4})',  # Date near Invoice No
-            ]
-            for pattern in date_patterns:
-                date_match = re.search(pattern, text, re.IGNORECASE)
-                if date_match:
-                    data['invoice_date'] = self._parse_date(date_match.group(1))
-                    break
+            # Invoice Date
+            invoice_date = _field_value(fields, 'invoice_date', _INVOICE_DATE_PATTERNS, text)
+            if invoice_date:
+                data['invoice_date'] = self._parse_date(invoice_date)
             
             # PO Number - only if not found in table
             if 'po_number' not in data:
-                po_patterns = [
-                    r'PO\s*NO[:\s.]*[:\s]*(\d+)',
-                    r'PO\s*Number[:\s]*(\d+)',
-                    r'P\.?O\.?[:\s]*(\d+)',
-                    r'Purchase\s*Order[:\s]*(\d+)'
-                ]
-                for pattern in po_patterns:
-                    po_match = re.search(pattern, text, re.IGNORECASE)
-                    if po_match:
-                        data['po_number'] = po_match.group(1)
-                        break
+                po_number = _field_value(fields, 'po_number', _PO_NO_PATTERNS, text)
+                if po_number:
+                    data['po_number'] = po_number
             
             # PO Date - only if not found in table
             if 'po_date' not in data:
-                po_date_patterns = [
-                    r'PO\s*DATE[:\s.]*[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',
-                    r'PO\s*DATE[:\s.]*[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-                    r'P\.?O\.?\s*Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})'
-                ]
-                for pattern in po_date_patterns:
-                    po_date_match = re.search(pattern, text, re.IGNORECASE)
-                    if po_date_match:
-                        data['po_date'] = self._parse_date(po_date_match.group(1))
-                        break
+                po_date = _field_value(fields, 'po_date', _PO_DATE_PATTERNS, text)
+                if po_date:
+                    data['po_date'] = self._parse_date(po_date)
             
             # GR ID - only if not found in table
             if 'gr_id' not in data:
-                gr_patterns = [
-                    r'GR\s*NO[:\s.]*[:\s]*(\d+)',
-                    r'GR\s*Number[:\s]*(\d+)',
-                    r'G\.?R\.?[:\s]*(\d+)',
-                    r'Goods\s*Receipt[:\s]*(\d+)'
-                ]
-                for pattern in gr_patterns:
-                    gr_match = re.search(pattern, text, re.IGNORECASE)
-                    if gr_match:
-                        data['gr_id'] = gr_match.group(1)
-                        break
+                gr_id = _field_value(fields, 'gr_id', _GR_NO_PATTERNS, text)
+                if gr_id:
+                    data['gr_id'] = gr_id
             
             # GR Date - only if not found in table
             if 'gr_date' not in data:
-                gr_date_patterns = [
-                    r'GR\s*DATE[:\s.]*[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})',
-                    r'GR\s*DATE[:\s.]*[:\s]*(\d{1,2}[-/]\d{1,2}[-/]\d{2,4})',
-                    r'G\.?R\.?\s*Date[:\s]*(\d{1,2}[-/]\w+[-/]\d{2,4})'
-                ]
-                for pattern in gr_date_patterns:
-                    gr_date_match = re.search(pattern, text, re.IGNORECASE)
-                    if gr_date_match:
-                        data['gr_date'] = self._parse_date(gr_date_match.group(1))
-                        break
-            
-            # Subtotal/Total - more flexible patterns
-            total_patterns = [
-                r'(?:^|\n)\s*TOTAL[:\s]+([0-9,]+\.?\d*)',
-                r'Sub\s*Total[:\s]+([0-9,]+\.?\d*)',
-                r'Amount[:\s]+([0-9,]+\.?\d*)'
-            ]
-            for pattern in total_patterns:
-                total_match = re.search(pattern, text, re.IGNORECASE | re.MULTILINE)
-                if total_match:
-                    data['subtotal'] = self._parse_amount(total_match.group(1))
-                    break
+                gr_date = _field_value(fields, 'gr_date', _GR_DATE_PATTERNS, text)
+                if gr_date:
+                    data['gr_date'] = self._parse_date(gr_date)
             
-            # Tax (KPRA or other) - more flexible patterns
-            tax_patterns = [
-                r'(?:KPRA|Tax)\s*\d+%[:\s]+([0-9,]+\.?\d*)',
-                r'(?:KPRA|Tax)[:\s]+([0-9,]+\.?\d*)',
-                r'VAT\s*\d+%[:\s]+([0-9,]+\.?\d*)'
-            ]
-            for pattern in tax_patterns:
-                tax_match = re.search(pattern, text, re.IGNORECASE)
-                if tax_match:
-                    data['tax'] = self._parse_amount(tax_match.group(1))
-                    break
+            # Subtotal/Total
+            subtotal = _field_value(fields, 'subtotal', _SUBTOTAL_PATTERNS, text)
+            if subtotal:
+                data['subtotal'] = self._parse_amount(subtotal)
             
-            # Grand Total - more flexible patterns
-            grand_total_patterns = [
-                r'GRAND\s*TOTAL[:\s]+([0-9,]+\.?\d*)',
-                r'Total\s*Amount[:\s]+([0-9,]+\.?\d*)',
-                r'Net\s*Total[:\s]+([0-9,]+\.?\d*)'
-            ]
-            for pattern in grand_total_patterns:
-                grand_total_match = re.search(pattern, text, re.IGNORECASE)
-                if grand_total_match:
-                    data['grand_total'] = self._parse_amount(grand_total_match.group(1))
-                    break
+            # Tax (KPRA or other)
+            tax = _field_value(fields, 'tax', _TAX_PATTERNS, text)
+            if tax:
+                data['tax'] = self._parse_amount(tax)
+            
+            # Grand Total
+            grand_total = _field_value(fields, 'grand_total', _GRAND_TOTAL_PATTERNS, text)
+            if grand_total:
+                data['grand_total'] = self._parse_amount(grand_total)
             
             # Calculate tax if not found (12% of subtotal)
             if 'subtotal' in data and 'tax' not in data:
@@ -355,22 +654,22 @@ class InvoiceProcessor:
         
         try:
             # PO Number
-            po_match = re.search(r'PO\s*(?:Number|NO)[:\s]+(\d+)', text, re.IGNORECASE)
+            po_match = _PO_DOC_NUMBER_RE.search(text)
             if po_match:
                 data['po_number'] = po_match.group(1)
             
             # PO Date
-            date_match = re.search(r'PO\s*DATE[:\s]+(\d{1,2}[-/]\w+[-/]\d{2,4})', text, re.IGNORECASE)
+            date_match = _PO_DOC_DATE_RE.search(text)
             if date_match:
                 data['po_date'] = self._parse_date(date_match.group(1))
             
             # PO Amount
-            amount_match = re.search(r'(?:Amount|Total)[:\s]+([0-9,]+\.?\d*)', text, re.IGNORECASE)
+            amount_match = _PO_DOC_AMOUNT_RE.search(text)
             if amount_match:
                 data['po_amount'] = self._parse_amount(amount_match.group(1))
             
             # Department (if mentioned)
-            dept_match = re.search(r'Department[:\s]+([A-Za-z\s]+)', text, re.IGNORECASE)
+            dept_match = _PO_DOC_DEPARTMENT_RE.search(text)
             if dept_match:
                 data['department'] = dept_match.group(1).strip()
             else:
@@ -384,47 +683,45 @@ class InvoiceProcessor:
     
     def _parse_date(self, date_str: str) -> str:
         """Parse date string to standard format"""
-        try:
-            # Try different date formats
-            formats = [
-                '%d-%b-%y', '%d-%b-%Y', '%d/%b/%y', '%d/%b/%Y',
-                '%d-%m-%y', '%d-%m-%Y', '%d/%m/%y', '%d/%m/%Y'
-            ]
-            
-            for fmt in formats:
-                try:
-                    dt = datetime.strptime(date_str, fmt)
-                    return dt.strftime('%d-%b-%Y')
-                except ValueError:
-                    continue
-            
+        match = _DATE_RE.fullmatch(date_str)
+        if not match:
             # If no format matches, return as is
             return date_str
-        except:
+        
+        day, _, month, year = match.groups()
+        if month.isdigit():
+            month = int(month)
+        else:
+            month = _MONTHS.get(month.lower())
+            if month is None:
+                return date_str
+        
+        # Two digit years follow strptime's %y: 69-99 -> 19xx, 00-68 -> 20xx
+        year = int(year)
+        if len(match.group(4)) == 2:
+            year += 1900 if year >= 69 else 2000
+        
+        try:
+            return datetime(year, month, int(day)).strftime('%d-%b-%Y')
+        except ValueError:  # e.g. 31-Feb
             return date_str
     
     def _parse_amount(self, amount_str: str) -> float:
         """Parse amount string to float"""
         try:
             # Remove commas and convert to float
-            return float(amount_str.replace(',', ''))
-        except:
+            return float(amount_str.translate(_STRIP_COMMAS))
+        except ValueError:
             return 0.0
     
     def _lookup_po_details(self, po_number: str) -> Tuple[Optional[str], Optional[str]]:
         """Lookup PO Date and Department from PO_Details sheet"""
-        ws = self.workbook["PO_Details"]
-        
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if row[1] == po_number:  # PO Number is in column 1 (index 1)
-                return row[2], row[4]  # PO Date (index 2), Department (index 4)
-        
-        return None, None
+        return self._po_index.get(po_number, (None, None))
     
     def add_po_record(self, po_data: Dict):
         """Add PO record to PO_Details sheet"""
-        ws = self.workbook["PO_Details"]
-        serial = self._get_next_serial_number("PO_Details")
+        serial = self._po_serial
+        self._po_serial += 1
         
         row = [
             serial,
@@ -434,30 +731,21 @@ class InvoiceProcessor:
             po_data.get('department', 'N/A')
         ]
         
-        ws.append(row)
+        self._po_rows.append(row)
+        self._po_index.setdefault(row[1], (row[2], row[4]))
         self.logger.info(f"Added PO record: {po_data.get('po_number')}")
     
-    def _invoice_exists(self, invoice_number: str) -> bool:
-        """Check if invoice number already exists in Invoice_Details sheet"""
-        ws = self.workbook["Invoice_Details"]
-        
-        for row in ws.iter_rows(min_row=2, values_only=True):
-            if row[1] == invoice_number:  # Invoice Number is in column 1 (index 1)
-                return True
-        
-        return False
-    
     def add_invoice_record(self, invoice_data: Dict):
         """Add invoice record to Invoice_Details sheet with PO linking"""
         invoice_number = invoice_data.get('invoice_number', '')
         
         # Check if invoice already exists
-        if invoice_number and self._invoice_exists(invoice_number):
+        if invoice_number and invoice_number in self._invoice_index:
             self.logger.info(f"Invoice {invoice_number} already exists - skipping")
             return
         
-        ws = self.workbook["Invoice_Details"]
-        serial = self._get_next_serial_number("Invoice_Details")
+        serial = self._invoice_serial
+        self._invoice_serial += 1
         
         # Lookup PO details if PO number exists
         po_number = invoice_data.get('po_number', '')
@@ -498,7 +786,8 @@ class InvoiceProcessor:
             invoice_data.get('status', 'UnPaid')
         ]
         
-        ws.append(row)
+        self._invoice_rows.append(row)
+        self._invoice_index.add(row[1])
         self.logger.info(f"Added invoice record: {invoice_data.get('invoice_number')}")
     
     def _log_error(self, filename: str, error: str):
@@ -507,41 +796,92 @@ class InvoiceProcessor:
             timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
             f.write(f"[{timestamp}] {filename}: {error}\n")
     
-    def process_file(self, file_path: Path):
-        """Process a single file (PDF or image)"""
+    def _file_digest(self, file_path: Path) -> Optional[str]:
+        """MD5 hash of the file contents, used as the text cache key"""
+        try:
+            return hashlib.md5(file_path.read_bytes()).hexdigest()
+        except OSError as e:
+            self.logger.warning(f"Could not hash {file_path.name}: {str(e)}")
+            return None
+    
+    def _extract_cached(self, file_path: Path, digest: Optional[str] = None) -> str:
+        """Extract text from a file, reusing cached text for identical contents"""
+        cache_file = self.text_cache_folder / f"{digest}.txt" if digest else None
+        if cache_file and cache_file.exists():
+            self.logger.info(f"Using cached text for {file_path.name}")
+            return cache_file.read_text(encoding='utf-8')
+        
+        if file_path.suffix.lower() in self.pdf_extensions:
+            text, complete = self._extract_pdf_text(file_path)
+        else:
+            text, complete = self._extract_image_text(file_path)
+        
+        # Partial text from a failed extraction is used for this run only
+        if cache_file and complete and text.strip():
+            # Write then rename so other worker processes never see a partial file
+            self.text_cache_folder.mkdir(parents=True, exist_ok=True)
+            tmp_file = cache_file.with_suffix(f".{os.getpid()}.tmp")
+            tmp_file.write_text(text, encoding='utf-8')
+            os.replace(tmp_file, cache_file)
+        
+        return text
+    
+    def _save_debug_text(self, file_path: Path, text: str):
+        """Write extracted text to the debug folder without blocking processing"""
+        self.debug_folder.mkdir(exist_ok=True)
+        debug_file = self.debug_folder / f"{file_path.stem}_extracted.txt"
+        
+        if self._io_pool is None:
+            self._io_pool = ThreadPoolExecutor(max_workers=2)
+        self._io_pool.submit(self._write_debug_file, debug_file, text)
+    
+    def _write_debug_file(self, debug_file: Path, text: str):
+        """Write a debug text file (runs on the background writer)"""
+        try:
+            with open(debug_file, 'w', encoding='utf-8') as f:
+                f.write(text)
+            self.logger.info(f"Saved extracted text to: {debug_file}")
+        except OSError as e:
+            self.logger.error(f"Error saving extracted text to {debug_file}: {str(e)}")
+    
+    def process_file(self, file_path: Path, digest: Optional[str] = None) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Extract and parse a single file (PDF or image)
+        
+        Returns a (po_data, invoice_data) tuple; at most one of them is set.
+        Excel state is not touched so this can run in a worker process.
+        """
         self.logger.info(f"Processing file: {file_path.name}")
         
         try:
-            # Extract text
-            if file_path.suffix.lower() in self.pdf_extensions:
-                text = self.extract_text_from_pdf(file_path)
-            elif file_path.suffix.lower() in self.image_extensions:
-                text = self.extract_text_from_image(file_path)
-            else:
+            if file_path.suffix.lower() not in self.pdf_extensions + self.image_extensions:
                 self.logger.warning(f"Unsupported file format: {file_path.name}")
-                return
+                return None, None
+            
+            # Extract text
+            text = self._extract_cached(file_path, digest)
             
             if not text.strip():
                 self.logger.warning(f"No text extracted from {file_path.name}")
                 self._log_error(file_path.name, "No text could be extracted")
-                return
+                return None, None
             
             # Save extracted text for debugging
-            debug_folder = Path("debug_ocr_text")
-            debug_folder.mkdir(exist_ok=True)
-            debug_file = debug_folder / f"{file_path.stem}_extracted.txt"
-            with open(debug_file, 'w', encoding='utf-8') as f:
-                f.write(text)
-            self.logger.info(f"Saved extracted text to: {debug_file}")
+            if self.debug:
+                self._save_debug_text(file_path, text)
             
             # Determine if it's an invoice or PO based on content
-            is_invoice = 'invoice' in text.lower() and 'invoice no' in text.lower()
-            is_po = 'purchase order' in text.lower() or ('po no' in text.lower() and 'invoice' not in text.lower())
+            keywords = set()
+            for match in _DOCTYPE_RE.finditer(text):
+                keywords.add(match.lastgroup)
+                if match.lastgroup == 'invoice_no':  # Invoice No makes it an invoice
+                    break
+            is_invoice = 'invoice_no' in keywords
+            is_po = 'purchase_order' in keywords or ('po_no' in keywords and 'invoice' not in keywords)
             
             if is_invoice:
                 invoice_data = self.parse_invoice_data(text)
                 if invoice_data:
-                    self.add_invoice_record(invoice_data)
+                    return None, invoice_data
                 else:
                     self.logger.warning(f"Could not parse invoice data from {file_path.name}")
                     self._log_error(file_path.name, "Failed to parse invoice data")
@@ -549,7 +889,7 @@ class InvoiceProcessor:
             elif is_po:
                 po_data = self.parse_po_data(text)
                 if po_data:
-                    self.add_po_record(po_data)
+                    return po_data, None
                 else:
                     self.logger.warning(f"Could not parse PO data from {file_path.name}")
                     self._log_error(file_path.name, "Failed to parse PO data")
@@ -561,6 +901,8 @@ class InvoiceProcessor:
         except Exception as e:
             self.logger.error(f"Error processing {file_path.name}: {str(e)}")
             self._log_error(file_path.name, str(e))
+        
+        return None, None
     
     def process_all_files(self):
         """Process all files in the invoices folder"""
@@ -581,17 +923,107 @@ class InvoiceProcessor:
         
         self.logger.info(f"Found {len(files)} files to process")
         
-        for file_path in files:
-            self.process_file(file_path)
+        # Skip files whose contents were already recorded in a previous run
+        digests = [self._file_digest(file_path) for file_path in files]
+        pending = [(file_path, digest) for file_path, digest in zip(files, digests)
+                   if digest is None or digest not in self._processed_files]
+        if len(pending) < len(files):
+            self.logger.info(f"Skipping {len(files) - len(pending)} unchanged files already processed")
+        if not pending:
+            return
         
-        # Save Excel file
-        self.save_excel()
+        # Extract and parse files in parallel; records are added here in the
+        # main process, in file order. Whatever was collected is saved even if
+        # processing stops part way through.
+        # Split the thread budget between the workers, so a small batch (e.g.
+        # one long scanned PDF) still OCRs its pages on all the cores
+        workers = min(len(pending), self.max_workers)
+        ocr_threads = max(1, self.max_workers // workers)
+        try:
+            crashed = []
+            with ProcessPoolExecutor(max_workers=workers,
+                                     initializer=_init_worker,
+                                     initargs=(self, ocr_threads)) as executor:
+                futures = [executor.submit(_process_file_in_worker, file_path, digest)
+                           for file_path, digest in pending]
+                for (file_path, digest), future in zip(pending, futures):
+                    # Results of files finished before a crash are still available
+                    if not self._collect_result(file_path, digest, future):
+                        crashed.append((file_path, digest))
+            
+            if crashed:
+                # A worker died (e.g. killed for memory) and took the pool down
+                # without saying which file it was on. Retry the unfinished files
+                # one per process, so a crash can only lose the file that caused it.
+                self.logger.error(f"A worker process crashed, retrying {len(crashed)} unfinished files")
+                for file_path, digest in crashed:
+                    with ProcessPoolExecutor(max_workers=1,
+                                             initializer=_init_worker,
+                                             initargs=(self, self.max_workers)) as executor:
+                        future = executor.submit(_process_file_in_worker, file_path, digest)
+                        if not self._collect_result(file_path, digest, future):
+                            self.logger.error(f"Worker process crashed while processing {file_path.name}")
+                            self._log_error(file_path.name, "Worker process crashed")
+        finally:
+            # Save Excel file
+            self.save_excel()
+    
+    def _collect_result(self, file_path: Path, digest: Optional[str], future) -> bool:
+        """Add the records from a worker's result
+        
+        Returns False if the worker process crashed before finishing the file.
+        """
+        try:
+            po_data, invoice_data = future.result()
+        except BrokenProcessPool:
+            return False
+        except Exception as e:
+            self.logger.error(f"Error processing {file_path.name}: {str(e)}")
+            self._log_error(file_path.name, str(e))
+            return True
+        
+        if po_data:
+            self.add_po_record(po_data)
+        if invoice_data:
+            self.add_invoice_record(invoice_data)
+        if digest and (po_data or invoice_data):
+            self._processed_files.add(digest)
+        return True
     
     def save_excel(self):
         """Save the Excel workbook"""
+        # Finish pending debug text writes
+        if self._io_pool is not None:
+            self._io_pool.shutdown()
+            self._io_pool = None
+        
         try:
-            self.workbook.save(self.excel_file)
+            if self.workbook is None and self.excel_file.exists():
+                # Written by an earlier save in this run
+                self.workbook = openpyxl.load_workbook(self.excel_file)
+            
+            if self.workbook is not None:
+                # Append to the existing workbook so other sheets and any
+                # formatting added by users are kept
+                self._append_sheet(self.workbook, "PO_Details", _PO_HEADERS, self._po_rows)
+                self._append_sheet(self.workbook, "Invoice_Details", _INVOICE_HEADERS, self._invoice_rows)
+                self._po_rows = []
+                self._invoice_rows = []
+                self.workbook.save(self.excel_file)
+            else:
+                # Write-only mode streams rows instead of building a cell graph
+                workbook = Workbook(write_only=True)
+                self._write_sheet(workbook, "PO_Details", _PO_HEADERS, self._po_rows)
+                self._write_sheet(workbook, "Invoice_Details", _INVOICE_HEADERS, self._invoice_rows)
+                workbook.save(self.excel_file)
+                self._po_rows = []
+                self._invoice_rows = []
             self.logger.info(f"Excel file saved: {self.excel_file}")
+            
+            # Only remember processed files once their records are saved
+            self.debug_folder.mkdir(exist_ok=True)
+            with open(self.processed_files_file, 'w', encoding='utf-8') as f:
+                json.dump(sorted(self._processed_files), f)
         except Exception as e:
             self.logger.error(f"Error saving Excel file: {str(e)}")
             self._log_error("Excel Save", str(e))